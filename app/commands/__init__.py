@@ -1,9 +1,15 @@
 from .command import Command
 from .generate_cmd import GenerateCommand
 from .init_cmd import InitCommand
+from .merge_cmd import MergeCommand
+from .relayout_cmd import RelayoutCommand
+from .validate_cmd import ValidateColorOrderCommand
 
 __ALL__ = [
     'Command',
     'InitCommand',
     'GenerateCommand',
+    'MergeCommand',
+    'RelayoutCommand',
+    'ValidateColorOrderCommand',
 ]
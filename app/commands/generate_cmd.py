@@ -6,9 +6,10 @@ from concurrent.futures.thread import ThreadPoolExecutor
 from pathlib import Path
 
 from app.config.constants import GENERATED_OUT_DIR
-from app.config.model import MMFitMode, MMDesktopLayout, MMImageSet
+from app.config.manifests import MMOutputStatus, MMManifestEntry, MMRunManifest, manifest_file_name, write_manifest
+from app.config.model import MMColorOrder, MMFitMode, MMDesktopLayout, MMImageSet, MMShard
 from app.config.profiles import load_profile
-from app.render.render import render_image_set
+from app.render import MMDecodedImageCache, MMSourcePrefetcher, render_image_set_layouts
 from .command import Command, SubParsersAction
 
 class GenerateCommand(Command):
@@ -46,6 +47,47 @@ class GenerateCommand(Command):
             default=1,
             help='The starting index when using the "{index}" key in wallpaper names. Defaults to 1.'
         )
+        parser.add_argument(
+            '--cache-size',
+            type=int,
+            default=2048,
+            help='Memory budget in MiB for decoded source images shared between sets, 0 disables caching. '
+                 'Defaults to 2048.'
+        )
+        parser.add_argument(
+            '--shard',
+            type=MMShard.parse,
+            default=None,
+            help='Only render shard K of N (e.g. "2/4"), sets are assigned by a stable hash of their file name. '
+                 'Defaults to rendering all sets.'
+        )
+        parser.add_argument(
+            '--manifest',
+            type=Path,
+            default=None,
+            help='Write a manifest of the produced images to this file. Defaults to '
+                 '"manifest-shard-K-of-N.json" in the output directory when sharded, and no manifest otherwise.'
+        )
+        parser.add_argument(
+            '--prefetch-depth',
+            type=int,
+            default=0,
+            help='Number of sets ahead to read source images for, useful on slow (network) storage. '
+                 'Defaults to 0 (disabled).'
+        )
+        parser.add_argument(
+            '--prefetch-workers',
+            type=int,
+            default=4,
+            help='The number of I/O workers used to prefetch source images. Defaults to 4.'
+        )
+        parser.add_argument(
+            '--color-order',
+            choices=[o.value for o in MMColorOrder],
+            default=MMColorOrder.AUTO.value,
+            help='Whether to convert colors before (BAKE_FIRST) or after (FIT_FIRST) fitting images. '
+                 'Defaults to "AUTO", converting after downscaling or cropping and before upscaling.'
+        )
 
     def execute(self, args: Namespace) -> int:
         self.logger.info(f'Loading config from {args.configuration}...')
@@ -55,56 +97,128 @@ class GenerateCommand(Command):
         bake_icc: bool = args.bake_icc
         max_workers: int = args.max_workers
         start_index: int = args.start_index
+        cache_size: int = args.cache_size
+        shard: MMShard | None = args.shard
+        manifest_path: Path | None = args.manifest
+        if manifest_path is None and shard:
+            manifest_path = output_dir / manifest_file_name(shard)
+        prefetch_depth: int = args.prefetch_depth
+        prefetch_workers: int = args.prefetch_workers
+        color_order = MMColorOrder(args.color_order)
         fit_mode: MMFitMode = profile.fit_mode
         background_color: str = profile.background_color
         compression_quality = profile.compression_quality
 
         self.logger.info(f"""\
 Configuration loaded:
-  Screens: {len(profile.monitors)}
+  Layouts: {', '.join(f'{n or "default"} ({len(m)} screens)' for n, m in profile.named_layouts().items())}
   Image sets: {len(profile.image_sets)}
   Replace images: {'yes' if replace_images else 'no'}
   Max workers: {max_workers}
   Bake ICC: {'yes' if bake_icc else 'no'}
   Start index: {start_index}
+  Cache size: {cache_size} MiB
+  Shard: {shard or 'all'}
+  Prefetch depth: {prefetch_depth}
+  Color order: {color_order.value}
   Fit mode: {fit_mode}
   Background color: {background_color}
   Compression quality: {compression_quality}
             """)
 
-        if not output_dir.exists():
-            logging.info(f'Creating directory {output_dir}...')
-            output_dir.mkdir(parents=True)
-
-        screen_layout = MMDesktopLayout(profile.monitors)
-
-        def image_set_handler(image_set: MMImageSet, index: int):
-            file_name = image_set.file_name.format(index=index)
-            set_out_path: Path = output_dir / file_name
-            if set_out_path.exists():
-                if not replace_images:
-                    self.logger.info(f'Image {file_name} already exists, skipping generation.')
-                    return
-
-            self.logger.info(f'Generating image {file_name}...')
-            render_image_set(image_set,
-                             set_out_path,
-                             screen_layout,
-                             fit_mode,
-                             background_color,
-                             bake_icc,
-                             compression_quality)
-
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures: list[Future[None]] = []
-
-            for (i, s) in enumerate(profile.image_sets):
-                i = start_index + i
-                future = executor.submit(image_set_handler, s, i)
-                futures.append(future)
-
-            for future in futures:
-                future.result()
-
-            self.logger.info('Done!')
-            return 0
+        # Named layouts render into a subdirectory of the output dir, the default layout into the output dir itself.
+        screen_layouts: dict[str, MMDesktopLayout] = {}
+        for layout_name, monitors in profile.named_layouts().items():
+            layout_dir = output_dir / layout_name
+            if not layout_dir.exists():
+                logging.info(f'Creating directory {layout_dir}...')
+                layout_dir.mkdir(parents=True)
+            screen_layouts[layout_name] = MMDesktopLayout(monitors)
+
+        image_cache = MMDecodedImageCache(cache_size * 1024 ** 2)
+
+        outputs: list[MMManifestEntry] = []
+        pending: list[tuple[MMImageSet, str, dict[Path, MMDesktopLayout]]] = []
+        for (i, s) in enumerate(profile.image_sets):
+            # Indices are based on the full set list, so names are the same for every shard.
+            file_name = s.file_name.format(index=start_index + i)
+            if shard and not shard.contains(file_name):
+                continue
+
+            targets: dict[Path, MMDesktopLayout] = {}
+            for layout_name, screen_layout in screen_layouts.items():
+                set_out_path = output_dir / layout_name / file_name
+                if set_out_path.exists() and not replace_images:
+                    self.logger.info(f'Image {set_out_path} already exists, skipping generation.')
+                    outputs.append(MMManifestEntry(file_name=self.__manifest_name(output_dir, set_out_path),
+                                                   status=MMOutputStatus.SKIPPED))
+                else:
+                    targets[set_out_path] = screen_layout
+
+            if targets:
+                pending.append((s, file_name, targets))
+
+        prefetcher: MMSourcePrefetcher | None = None
+        if prefetch_depth > 0:
+            prefetch_order = [[p for p in s.images.values() if p] for s, _, _ in pending]
+            prefetcher = MMSourcePrefetcher(prefetch_order, prefetch_depth, prefetch_workers)
+
+        def image_set_handler(image_set: MMImageSet,
+                              file_name: str,
+                              targets: dict[Path, MMDesktopLayout],
+                              position: int) -> list[MMManifestEntry]:
+            if prefetcher:
+                prefetcher.start(position)
+
+            try:
+                self.logger.info(f'Generating image {file_name} for {len(targets)} layouts...')
+                render_image_set_layouts(image_set,
+                                         targets,
+                                         fit_mode,
+                                         background_color,
+                                         bake_icc,
+                                         compression_quality,
+                                         image_cache,
+                                         prefetcher,
+                                         color_order)
+                return [
+                    MMManifestEntry(file_name=self.__manifest_name(output_dir, p), status=MMOutputStatus.GENERATED)
+                    for p in targets.keys()
+                ]
+            finally:
+                if prefetcher:
+                    prefetcher.finish(position)
+
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures: list[Future[list[MMManifestEntry]]] = [
+                    executor.submit(image_set_handler, s, file_name, targets, position)
+                    for position, (s, file_name, targets) in enumerate(pending)
+                ]
+
+                for future in futures:
+                    outputs.extend(future.result())
+        finally:
+            # Only once all workers are done, so none of them still starts or finishes a set.
+            if prefetcher:
+                prefetcher.close()
+
+        manifest = MMRunManifest(
+            shard=shard,
+            start_index=start_index,
+            total_sets=len(profile.image_sets),
+            outputs=outputs
+        )
+
+        self.logger.debug(f'Image cache: {image_cache.hits} hits, {image_cache.misses} misses, '
+                          f'{image_cache.evictions} evictions.')
+
+        if manifest_path:
+            self.logger.info(f'Writing manifest of {len(manifest.outputs)} images to {manifest_path}...')
+            write_manifest(manifest_path, manifest)
+        self.logger.info('Done!')
+        return 0
+
+    @staticmethod
+    def __manifest_name(output_dir: Path, output_path: Path) -> str:
+        return output_path.relative_to(output_dir).as_posix()
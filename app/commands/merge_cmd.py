@@ -0,0 +1,94 @@
+from argparse import Namespace, ArgumentParser
+from collections import Counter
+from pathlib import Path
+
+from app.config.constants import GENERATED_OUT_DIR
+from app.config.manifests import MMRunManifest, load_manifest, manifest_file_name, write_manifest
+from app.config.profiles import load_profile
+from .command import Command, SubParsersAction
+
+
+class MergeCommand(Command):
+
+    def __init__(self, sub_parsers: SubParsersAction):
+        super().__init__(sub_parsers, 'merge', 'Merge and verify the manifests of sharded generate runs')
+
+    def register_arguments(self, parser: ArgumentParser):
+        parser.add_argument(
+            'manifests',
+            nargs='+',
+            type=Path,
+            help='The shard manifests to merge.'
+        )
+        parser.add_argument(
+            '-o', '--output-dir',
+            default=GENERATED_OUT_DIR,
+            type=Path,
+            help='The directory to write the merged manifest to. Defaults to "./generated"'
+        )
+
+    def execute(self, args: Namespace) -> int:
+        self.logger.info(f'Loading config from {args.configuration}...')
+        profile = load_profile(args.configuration)
+        output_dir: Path = args.output_dir
+
+        manifests: list[MMRunManifest] = [load_manifest(p) for p in args.manifests]
+        self.logger.info(f'Loaded {len(manifests)} manifests.')
+
+        start_indices = {m.start_index for m in manifests}
+        if len(start_indices) != 1:
+            self.logger.error(f'Manifests use different start indices: {sorted(start_indices)}.')
+            return 1
+        start_index = start_indices.pop()
+
+        if any(m.total_sets != len(profile.image_sets) for m in manifests):
+            self.logger.error(f'Manifests were generated for a different number of image sets than '
+                              f'the {len(profile.image_sets)} in {args.configuration}.')
+            return 1
+
+        shard_counts = {m.shard.count if m.shard else 1 for m in manifests}
+        shard_indices = Counter(m.shard.index if m.shard else 1 for m in manifests)
+        if len(shard_counts) != 1:
+            self.logger.error(f'Manifests use different shard counts: {sorted(shard_counts)}.')
+            return 1
+        shard_count = shard_counts.pop()
+
+        missing_shards = [i for i in range(1, shard_count + 1) if i not in shard_indices]
+        duplicate_shards = [i for i, n in shard_indices.items() if n > 1]
+        if missing_shards or duplicate_shards:
+            self.logger.error(f'Expected each of {shard_count} shards exactly once, '
+                              f'missing: {missing_shards}, duplicated: {duplicate_shards}.')
+            return 1
+
+        expected_names = {
+            (Path(layout_name) / s.file_name.format(index=start_index + i)).as_posix()
+            for i, s in enumerate(profile.image_sets)
+            for layout_name in profile.named_layouts().keys()
+        }
+        produced = Counter(o.file_name for m in manifests for o in m.outputs)
+
+        missing = sorted(expected_names - produced.keys())
+        duplicated = sorted(n for n, c in produced.items() if c > 1)
+        unexpected = sorted(produced.keys() - expected_names)
+        for file_name in missing:
+            self.logger.error(f'Image {file_name} was not produced by any shard.')
+        for file_name in duplicated:
+            self.logger.error(f'Image {file_name} was produced by {produced[file_name]} shards.')
+        for file_name in unexpected:
+            self.logger.error(f'Image {file_name} is not part of {args.configuration}.')
+        if missing or duplicated or unexpected:
+            return 1
+
+        merged = MMRunManifest(
+            start_index=start_index,
+            total_sets=len(profile.image_sets),
+            outputs=sorted((o for m in manifests for o in m.outputs), key=lambda o: o.file_name)
+        )
+
+        if not output_dir.exists():
+            output_dir.mkdir(parents=True)
+
+        merged_path = output_dir / manifest_file_name(None)
+        self.logger.info(f'All {len(merged.outputs)} images were produced exactly once, writing {merged_path}...')
+        write_manifest(merged_path, merged)
+        return 0
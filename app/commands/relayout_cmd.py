@@ -0,0 +1,169 @@
+import os
+from argparse import Namespace, ArgumentParser
+from concurrent.futures import Future
+from concurrent.futures.thread import ThreadPoolExecutor
+from pathlib import Path
+
+from app.config.constants import GENERATED_OUT_DIR
+from app.config.model import MMDesktopLayout, MMImageSet, MMProfile
+from app.config.profiles import load_profile, write_profile
+from app.render import relayout_image_set, render_image_set
+from app.screens import get_monitor_layout, BACKENDS
+from .command import Command, SubParsersAction
+
+
+class RelayoutCommand(Command):
+
+    def __init__(self, sub_parsers: SubParsersAction):
+        super().__init__(sub_parsers, 'relayout',
+                         'Update the screen layout and re-render only the monitors that changed')
+
+    def register_arguments(self, parser: ArgumentParser):
+        parser.add_argument(
+            '--backend',
+            choices=[b for b in BACKENDS if b != 'none'],
+            default=BACKENDS[0],
+            required=False,
+            help=f'The backend used to detect the new monitor layout. Defaults to "{BACKENDS[0]}"'
+        )
+        parser.add_argument(
+            '--xrandr-monitors',
+            type=Path,
+            default=None,
+            help='Read the new layout from saved "xrandr --listactivemonitors" output instead of detecting it. '
+                 'ICC profiles are kept from the previous layout.'
+        )
+        parser.add_argument(
+            '-l', '--layout',
+            default='',
+            help='The named layout to update, required when the profile uses named layouts. '
+                 'Defaults to the monitors list of the profile.'
+        )
+        parser.add_argument(
+            '-o', '--output-dir',
+            default=GENERATED_OUT_DIR,
+            type=Path,
+            help='The directory containing the previously generated images. Defaults to "./generated"'
+        )
+        parser.add_argument(
+            '--bake-icc',
+            action='store_true',
+            default=False,
+            help='Bake monitor ICC profiles, must match the previous generate run. Defaults to "False".'
+        )
+        parser.add_argument(
+            '-w', '--max-workers',
+            type=int,
+            default=max(4, os.cpu_count()),
+            help='The maximum number of workers to use. Defaults to the cpu core count with a minimum of 4.'
+        )
+        parser.add_argument(
+            '-i', '--start-index',
+            type=int,
+            default=1,
+            help='The starting index when using the "{index}" key in wallpaper names. Defaults to 1.'
+        )
+
+    def execute(self, args: Namespace) -> int:
+        self.logger.info(f'Loading config from {args.configuration}...')
+        profile = load_profile(args.configuration)
+        layout_name: str = args.layout
+        output_dir: Path = args.output_dir / layout_name
+        bake_icc: bool = args.bake_icc
+        start_index: int = args.start_index
+
+        named_layouts = profile.named_layouts()
+        if layout_name not in named_layouts:
+            self.logger.error(f'Layout {layout_name} does not exist in {args.configuration}.')
+            return 1
+        previous_monitors = named_layouts[layout_name]
+
+        if args.xrandr_monitors:
+            self.logger.info(f'Reading screen layout from {args.xrandr_monitors}...')
+            from app.screens.xrandr import load_xrandr_monitor_layout
+            monitors = load_xrandr_monitor_layout(args.xrandr_monitors)
+        else:
+            self.logger.info(f'Detecting screen layout using backend {args.backend}..')
+            monitors = get_monitor_layout(args.backend)
+
+        # Keep known ICC profiles for monitors the new layout has none for.
+        previous_icc = {m.device_id: m.icc for m in previous_monitors}
+        monitors = [m if m.icc else m.model_copy(update={'icc': previous_icc.get(m.device_id, None)})
+                    for m in monitors]
+
+        try:
+            if layout_name:
+                updated = profile.model_dump() | {'layouts': profile.layouts | {layout_name: monitors}}
+            else:
+                updated = profile.model_dump() | {'monitors': monitors}
+            new_profile = MMProfile.model_validate(updated)
+        except ValueError as e:
+            self.logger.error(f'The new layout does not fit the profile: {e}')
+            return 1
+
+        previous_layout = MMDesktopLayout(list(previous_monitors))
+        new_layout = MMDesktopLayout(list(monitors))
+        unchanged = new_layout.unchanged_monitors(previous_layout, bake_icc)
+        self.logger.info(f"""\
+Layout compared:
+  Unchanged: {', '.join(unchanged.keys()) or 'none'}
+  Changed: {', '.join(m.device_id for m in new_layout.monitors if m.device_id not in unchanged) or 'none'}
+            """)
+
+        def image_set_handler(image_set: MMImageSet, file_name: str, temp_path: Path):
+            set_out_path = output_dir / file_name
+            if not set_out_path.exists():
+                self.logger.info(f'Image {file_name} was not generated before, rendering all monitors...')
+                render_image_set(image_set,
+                                 temp_path,
+                                 new_layout,
+                                 profile.fit_mode,
+                                 profile.background_color,
+                                 bake_icc,
+                                 profile.compression_quality)
+                return
+
+            rendered = relayout_image_set(image_set,
+                                          set_out_path,
+                                          previous_layout,
+                                          temp_path,
+                                          new_layout,
+                                          profile.fit_mode,
+                                          profile.background_color,
+                                          bake_icc,
+                                          profile.compression_quality)
+            self.logger.info(f'Image {file_name} updated, rendered {rendered} monitors.')
+
+        if not output_dir.exists():
+            output_dir.mkdir(parents=True)
+
+        # Render next to the outputs and only move them into place once every set succeeded,
+        # so a failed run leaves both the previous images and the profile untouched.
+        file_names = [s.file_name.format(index=start_index + i) for i, s in enumerate(profile.image_sets)]
+        temp_paths = {n: self.__temp_path(output_dir / n) for n in file_names}
+
+        try:
+            with ThreadPoolExecutor(max_workers=args.max_workers) as executor:
+                futures: list[Future[None]] = [
+                    executor.submit(image_set_handler, s, n, temp_paths[n])
+                    for s, n in zip(profile.image_sets, file_names)
+                ]
+
+                for future in futures:
+                    future.result()
+
+            for file_name, temp_path in temp_paths.items():
+                os.replace(temp_path, output_dir / file_name)
+        finally:
+            for temp_path in temp_paths.values():
+                temp_path.unlink(missing_ok=True)
+
+        self.logger.info(f'Writing config to {args.configuration}...')
+        write_profile(args.configuration, new_profile)
+        self.logger.info('Done!')
+        return 0
+
+    @staticmethod
+    def __temp_path(output_path: Path) -> Path:
+        # Keep the suffix, the output format is picked from it.
+        return output_path.with_name(f'.{output_path.stem}.relayout{output_path.suffix}')
@@ -0,0 +1,83 @@
+from argparse import Namespace, ArgumentParser
+
+from app.config.model import MMColorOrder, MMDesktopLayout
+from app.config.profiles import load_profile
+from app.render import measure_color_order_difference
+from .command import Command, SubParsersAction
+
+
+class ValidateColorOrderCommand(Command):
+
+    def __init__(self, sub_parsers: SubParsersAction):
+        super().__init__(sub_parsers, 'validate-color-order',
+                         'Measure the color difference the chosen color order makes against converting colors '
+                         'before fitting')
+
+    def register_arguments(self, parser: ArgumentParser):
+        parser.add_argument(
+            '-n', '--sets',
+            type=int,
+            default=5,
+            help='The number of image sets (from the start of the profile) to test. Defaults to 5.'
+        )
+        parser.add_argument(
+            '-t', '--threshold',
+            type=float,
+            default=1.0,
+            help='The maximum allowed mean Delta E (CIE76) per monitor. Defaults to 1.0.'
+        )
+        parser.add_argument(
+            '--bake-icc',
+            action='store_true',
+            default=False,
+            help='Bake monitor ICC profiles, as in the generate command. Defaults to "False".'
+        )
+        parser.add_argument(
+            '--color-order',
+            choices=[o.value for o in MMColorOrder],
+            default=MMColorOrder.AUTO.value,
+            help='The color order to validate, as in the generate command. Defaults to "AUTO", measuring only the '
+                 'monitors it converts after fitting.'
+        )
+
+    def execute(self, args: Namespace) -> int:
+        self.logger.info(f'Loading config from {args.configuration}...')
+        profile = load_profile(args.configuration)
+        threshold: float = args.threshold
+        color_order = MMColorOrder(args.color_order)
+        test_sets = profile.image_sets[:args.sets]
+        layouts = {n: MMDesktopLayout(m) for n, m in profile.named_layouts().items()}
+
+        self.logger.info(f'Comparing color order {color_order.value} to BAKE_FIRST on {len(test_sets)} image sets...')
+        failures = 0
+        worst_mean = 0.0
+
+        for image_set in test_sets:
+            for layout_name, layout in layouts.items():
+                differences = measure_color_order_difference(image_set,
+                                                             layout,
+                                                             profile.fit_mode,
+                                                             args.bake_icc,
+                                                             color_order)
+
+                for device_id, difference in differences.items():
+                    target = '/'.join(filter(None, [layout_name, device_id]))
+                    if difference is None:
+                        self.logger.info(f'{image_set.file_name} on {target}: converted before fitting, identical.')
+                        continue
+
+                    mean, maximum = difference
+                    worst_mean = max(worst_mean, mean)
+                    message = f'{image_set.file_name} on {target}: mean ΔE {mean:.3f}, max ΔE {maximum:.3f}'
+                    if mean > threshold:
+                        failures += 1
+                        self.logger.error(message)
+                    else:
+                        self.logger.info(message)
+
+        if failures:
+            self.logger.error(f'{failures} monitors exceed the mean ΔE threshold of {threshold}.')
+            return 1
+
+        self.logger.info(f'All monitors are within the mean ΔE threshold of {threshold} (worst {worst_mean:.3f}).')
+        return 0
@@ -1,5 +1,7 @@
 from .constants import PROFILES_DIR, GENERATED_OUT_DIR, ALLOWED_EXTENSIONS, STANDARD_SRGB_PROFILE, TARGET_IMAGE_MODE
-from .model import MMFitMode, MMMonitor, MMDesktopLayout, MMImageSet, MMProfile
+from .manifests import MMManifestLoadSaveException, MMOutputStatus, MMManifestEntry, MMRunManifest, manifest_file_name, \
+    load_manifest, write_manifest
+from .model import MMFitMode, MMColorOrder, MMMonitor, MMDesktopLayout, MMImageSet, MMProfile, MMShard
 from .profiles import MMProfileLoadSaveException, list_profiles, load_profile, write_profile
 
 __ALL__ = [
@@ -9,12 +11,21 @@ __ALL__ = [
     'STANDARD_SRGB_PROFILE',
     'TARGET_IMAGE_MODE',
     'MMFitMode',
+    'MMColorOrder',
     'MMMonitor',
     'MMDesktopLayout',
     'MMImageSet',
     'MMProfile',
+    'MMShard',
     'MMProfileLoadSaveException',
     'list_profiles',
     'load_profile',
     'write_profile',
+    'MMManifestLoadSaveException',
+    'MMOutputStatus',
+    'MMManifestEntry',
+    'MMRunManifest',
+    'manifest_file_name',
+    'load_manifest',
+    'write_manifest',
 ]
@@ -0,0 +1,53 @@
+import json
+from enum import Enum
+from pathlib import Path
+
+from pydantic import BaseModel, Field
+
+from .model import MMShard
+
+
+class MMManifestLoadSaveException(Exception):
+    pass
+
+
+class MMOutputStatus(Enum):
+    GENERATED = 'GENERATED'
+    SKIPPED = 'SKIPPED'
+
+
+class MMManifestEntry(BaseModel):
+    file_name: str = Field(description='Output file name')
+    status: MMOutputStatus = Field(description='Whether the image was generated or already existed')
+
+
+class MMRunManifest(BaseModel):
+    shard: MMShard | None = Field(description='Shard rendered by this run, None when not sharded', default=None)
+    start_index: int = Field(description='Starting index used for "{index}" in wallpaper names', default=1)
+    total_sets: int = Field(description='Number of image sets in the profile', default=0)
+    outputs: list[MMManifestEntry] = Field(description='Images produced by this run', default=[])
+
+
+def manifest_file_name(shard: MMShard | None) -> str:
+    if shard is None:
+        return 'manifest.json'
+    return f'manifest-shard-{shard.index}-of-{shard.count}.json'
+
+
+def load_manifest(manifest_path: Path) -> MMRunManifest:
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        return MMRunManifest.model_validate(data)
+    except Exception as e:
+        raise MMManifestLoadSaveException(f'Failed to load manifest from {manifest_path}: {e}') from e
+
+
+def write_manifest(manifest_path: Path, data: MMRunManifest):
+    try:
+        model_dump = data.model_dump(mode='json')
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            json.dump(model_dump, f, indent=2)
+    except Exception as e:
+        raise MMManifestLoadSaveException(f'Failed to save manifest to {manifest_path}') from e
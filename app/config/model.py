@@ -1,3 +1,4 @@
+import hashlib
 from enum import Enum
 from pathlib import Path
 
@@ -11,6 +12,12 @@ class MMFitMode(Enum):
     CONTAIN = 'CONTAIN'
 
 
+class MMColorOrder(Enum):
+    AUTO = 'AUTO'
+    BAKE_FIRST = 'BAKE_FIRST'
+    FIT_FIRST = 'FIT_FIRST'
+
+
 class MMMonitor(BaseModel):
     device_id: str = Field(description='Device ID')
     x_pos: int = Field(description='Screen x position')
@@ -51,6 +58,38 @@ class MMDesktopLayout:
         self.total_width = int(self.max_x - self.min_x)
         self.total_height = int(self.max_y - self.min_y)
 
+    def offset_of(self, monitor: MMMonitor) -> tuple[int, int]:
+        """
+        Get the position of a monitor on the canvas of this layout.
+
+        :param monitor: One of the monitors of this layout.
+        :return: The (x, y) offset of the monitor's top-left corner on the layout canvas.
+        """
+        return int(monitor.x_pos - self.min_x), int(monitor.y_pos - self.min_y)
+
+    def unchanged_monitors(self, previous: 'MMDesktopLayout', bake_screen_icc: bool) -> dict[str, MMMonitor]:
+        """
+        Compare this layout to a previous one, to find the monitors whose rendered region can be reused.
+        A monitor is unchanged when the previous layout has a monitor with the same device ID, size and, when ICC
+        profiles are baked, ICC. Its position is allowed to differ.
+
+        :param previous: The layout to compare to.
+        :param bake_screen_icc: Whether the images are rendered with each monitor’s ICC profile baked in.
+        :return: The monitors of the previous layout that are unchanged in this layout, by device ID.
+        """
+        previous_monitors = {m.device_id: m for m in previous.monitors}
+        unchanged: dict[str, MMMonitor] = {}
+
+        for monitor in self.monitors:
+            old = previous_monitors.get(monitor.device_id, None)
+            if not old or (old.width, old.height) != (monitor.width, monitor.height):
+                continue
+            if bake_screen_icc and old.icc != monitor.icc:
+                continue
+            unchanged[monitor.device_id] = old
+
+        return unchanged
+
 
 class MMImageSet(BaseModel):
     file_name: str = Field(description='Image name', min_length=1, default="Wallpaper {index}.jpg")
@@ -66,12 +105,25 @@ class MMImageSet(BaseModel):
 
 
 class MMProfile(BaseModel):
-    monitors: list[MMMonitor] = Field(description='Screen list', default=[])
+    monitors: list[MMMonitor] = Field(description='Screen list, used when no named layouts are defined', default=[])
+    layouts: dict[str, list[MMMonitor]] = Field(description='Named screen lists, rendered to subdirectories',
+                                                default={})
     background_color: str = Field(description='Background color', default='black')
     fit_mode: MMFitMode = Field(description='Image fit mode', default=MMFitMode.COVER)
     compression_quality: int = Field(description='Compression quality', default=100)
     image_sets: list[MMImageSet] = Field(description='Image set list', default=[])
 
+    @field_validator('layouts', mode='after')
+    @classmethod
+    def validate_layout_names(cls, v: dict[str, list[MMMonitor]]) -> dict[str, list[MMMonitor]]:
+        # Layout names are used as output subdirectories.
+        for name, monitors in v.items():
+            if not name or '/' in name or name in ('.', '..'):
+                raise ValueError(f'Layout name "{name}" can not be used as a directory name.')
+            if not monitors:
+                raise ValueError(f'Layout {name} does not contain any monitors.')
+        return v
+
     @field_validator('image_sets', mode='after')
     @classmethod
     def validate_unique_set_names(cls, v: list[MMImageSet]) -> list[MMImageSet]:
@@ -82,12 +134,71 @@ class MMProfile(BaseModel):
             raise ValueError('Image set names must not contain duplicate names.')
         return v
 
+    @model_validator(mode='after')
+    def validate_monitors_or_layouts(self) -> 'MMProfile':
+        if self.monitors and self.layouts:
+            raise ValueError('Define either monitors or named layouts, not both.')
+        return self
+
     @model_validator(mode='after')
     def validate_device_ids(self) -> 'MMProfile':
         # Images are assigned by monitor device ID, we need to check that all set ids are known.
-        device_ids = {m.device_id for m in self.monitors}
+        device_ids = {m.device_id for monitors in self.named_layouts().values() for m in monitors}
         for s in self.image_sets:
             for k in s.images.keys():
                 if k not in device_ids:
                     raise ValueError(f'Image set {s.file_name} contains an unknown device id ({k}).')
         return self
+
+    def named_layouts(self) -> dict[str, list[MMMonitor]]:
+        """
+        Get the screen lists to render, by layout name. Without named layouts, the monitors list is returned
+        as a single layout with an empty name, which renders straight into the output directory.
+
+        :return: A dictionary of layout name to the monitors of that layout.
+        """
+        return self.layouts if self.layouts else {'': self.monitors}
+
+
+class MMShard(BaseModel):
+    index: int = Field(description='Shard number, starting at 1', gt=0)
+    count: int = Field(description='Total number of shards', gt=0)
+
+    @model_validator(mode='after')
+    def validate_index_in_range(self) -> 'MMShard':
+        if self.index > self.count:
+            raise ValueError(f'Shard index {self.index} exceeds shard count {self.count}.')
+        return self
+
+    @classmethod
+    def parse(cls, spec: str) -> 'MMShard':
+        """
+        Parse a shard specification in the form ``K/N``, where K is the 1-based shard number and N the shard count.
+
+        :param spec: The shard specification, e.g. ``"2/4"``.
+        :return: The parsed shard.
+        :raises ValueError: If the specification is malformed or K is not within 1..N.
+        """
+        index, sep, count = spec.partition('/')
+        if not sep:
+            raise ValueError(f'Invalid shard "{spec}", expected K/N.')
+        return cls(index=int(index), count=int(count))
+
+    @staticmethod
+    def shard_index_of(file_name: str, count: int) -> int:
+        """
+        Determine the shard a wallpaper belongs to from a stable hash of its output file name.
+        The result is the same on every machine and Python process, unlike the builtin ``hash``.
+
+        :param file_name: The formatted output file name of the image set.
+        :param count: Total number of shards.
+        :return: The 1-based shard number the file name is assigned to.
+        """
+        digest = hashlib.sha256(file_name.encode('utf-8')).digest()
+        return int.from_bytes(digest[:8], 'big') % count + 1
+
+    def contains(self, file_name: str) -> bool:
+        return self.shard_index_of(file_name, self.count) == self.index
+
+    def __str__(self) -> str:
+        return f'{self.index}/{self.count}'
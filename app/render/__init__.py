@@ -1,3 +1,12 @@
-from .render import render_image_set
+from .cache import MMDecodedImageCache
+from .prefetch import MMSourcePrefetcher
+from .render import render_image_set, render_image_set_layouts, relayout_image_set, measure_color_order_difference
 
-__ALL__ = ['render_image_set']
+__ALL__ = [
+    'MMDecodedImageCache',
+    'MMSourcePrefetcher',
+    'render_image_set',
+    'render_image_set_layouts',
+    'relayout_image_set',
+    'measure_color_order_difference',
+]
@@ -0,0 +1,104 @@
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from concurrent.futures import Future
+
+from PIL import Image
+
+
+class MMDecodedImageCache:
+    """
+    Thread-safe LRU cache of decoded images, bounded by the total size of the cached pixel data.
+
+    Concurrent requests for a key that is not cached yet wait on a single in-flight load, so the
+    same source is never decoded more than once at the same time. Cached images are shared between
+    workers and must be treated as read-only.
+    """
+    max_bytes: int
+    hits: int
+    misses: int
+    evictions: int
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.__lock = threading.Lock()
+        self.__entries: OrderedDict[Hashable, Image.Image] = OrderedDict()
+        self.__in_flight: dict[Hashable, Future[Image.Image]] = {}
+        self.__size_bytes = 0
+
+    @property
+    def size_bytes(self) -> int:
+        return self.__size_bytes
+
+    def peek(self, key: Hashable) -> Image.Image | None:
+        """
+        Get the image for the given key if it is cached, without loading it or waiting on an in-flight load.
+        Does not count as a hit or miss.
+
+        :param key: Key identifying the decoded image.
+        :return: The cached image, or None when it is not cached.
+        """
+        with self.__lock:
+            return self.__entries.get(key)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Image.Image]) -> Image.Image:
+        """
+        Get the image for the given key, calling the loader when it is not cached.
+        If another worker is already loading the same key, wait for its result instead.
+
+        :param key: Key identifying the decoded image.
+        :param loader: Function producing the image when it is not cached or in flight.
+        :return: The cached or freshly loaded image.
+        :raises Exception: Any exception raised by the loader, also for workers waiting on it.
+        """
+        with self.__lock:
+            image = self.__entries.get(key)
+            if image is not None:
+                self.__entries.move_to_end(key)
+                self.hits += 1
+                return image
+
+            future = self.__in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self.__in_flight[key] = future
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        if not owner:
+            return future.result()
+
+        try:
+            image = loader()
+        except BaseException as e:
+            with self.__lock:
+                del self.__in_flight[key]
+            future.set_exception(e)
+            raise
+
+        with self.__lock:
+            del self.__in_flight[key]
+            self.__put(key, image)
+        future.set_result(image)
+
+        return image
+
+    def __put(self, key: Hashable, image: Image.Image):
+        image_bytes = image.width * image.height * len(image.getbands())
+        if image_bytes > self.max_bytes:
+            # Would evict everything and still not fit.
+            return
+
+        self.__entries[key] = image
+        self.__size_bytes += image_bytes
+
+        while self.__size_bytes > self.max_bytes:
+            _, evicted = self.__entries.popitem(last=False)
+            self.__size_bytes -= evicted.width * evicted.height * len(evicted.getbands())
+            self.evictions += 1
@@ -1,42 +1,51 @@
 from PIL import Image
 
-from app.config.constants import TARGET_IMAGE_MODE
 from app.config.model import MMFitMode, MMMonitor
 
+type MMFitTile = tuple[Image.Image, tuple[int, int]]
 
-def __fit_image_to_screen_centered(image: Image.Image, monitor: MMMonitor, background_color: str) -> Image.Image:
+
+def __resampling_for(target_width: int, source_width: float) -> Image.Resampling:
+    return Image.Resampling.LANCZOS if target_width > source_width else Image.Resampling.BICUBIC
+
+
+def __fit_image_to_screen_centered(image: Image.Image, monitor: MMMonitor) -> MMFitTile:
     """
-    Place an image onto a monitor-sized canvas, centering it without scaling and filling the
-    remaining area with the background color.
+    Center an image on a monitor without scaling it.
+    Only the part of the image that is visible on the monitor is returned, together with the
+    offset within the monitor it should be pasted at. The remaining area is left untouched, so
+    it keeps the background color of the canvas it is pasted onto.
 
-    :param image: The source image to be placed on the result canvas.
+    :param image: The source image to be placed on the monitor.
     :param monitor: Monitor information providing width and height.
-    :param background_color: Color used for the background of the resulting
-       image.
-    :return: A new Image.Image instance with dimensions matching the
-       monitor, containing the original image centered over the specified
-       background color.
+    :return: A tuple of the visible image region and its (x, y) offset within the monitor.
     """
-    result = Image.new(TARGET_IMAGE_MODE, (monitor.width, monitor.height), color=background_color)
-
     paste_x = (monitor.width - image.width) // 2
     paste_y = (monitor.height - image.height) // 2
-    result.paste(image, (paste_x, paste_y))
 
-    return result
+    if paste_x >= 0 and paste_y >= 0:
+        # Image fits entirely, no need to copy anything.
+        return image, (paste_x, paste_y)
 
+    left = max(0, -paste_x)
+    top = max(0, -paste_y)
+    right = left + min(image.width, monitor.width)
+    bottom = top + min(image.height, monitor.height)
 
-def __fit_image_to_screen_cover(image: Image.Image, monitor: MMMonitor) -> Image.Image:
+    return image.crop((left, top, right, bottom)), (max(0, paste_x), max(0, paste_y))
+
+
+def __fit_image_to_screen_cover(image: Image.Image, monitor: MMMonitor) -> MMFitTile:
     """
     Fit an image to cover a monitor screen while preserving its aspect ratio.
-    The image is first scaled so that it completely covers the target resolution,
-    then centered and cropped to match the monitor’s exact dimensions.
+    Rather than scaling the whole image and cropping the result, only the centered source region
+    that remains visible after scaling is resampled, straight to the monitor’s exact dimensions.
 
-    :param image: The source :class:`PIL.Image.Image` to be resized and cropped.
+    :param image: The source :class:`PIL.Image.Image` to be resized.
     :param monitor: An :class:`MMMonitor` instance providing ``width`` and
         ``height`` attributes for the desired output size.
-    :return: A new :class:`PIL.Image.Image` that exactly matches the monitor’s
-        resolution, with any excess area centered and removed.
+    :return: A tuple of a new :class:`PIL.Image.Image` that exactly matches the monitor’s
+        resolution and its (x, y) offset within the monitor, which is always ``(0, 0)``.
     """
     img_aspect = image.width / image.height
     screen_aspect = monitor.width / monitor.height
@@ -51,75 +60,122 @@ def __fit_image_to_screen_cover(image: Image.Image, monitor: MMMonitor) -> Image
         target_width = monitor.width
         target_height = monitor.height
 
-    resampling = Image.Resampling.LANCZOS if target_width > image.width else Image.Resampling.BICUBIC
-    scaled_image = image.resize((target_width, target_height), resampling)
-
+    # Crop rectangle in scaled coordinates, mapped back onto the source image.
     left_crop = (target_width - monitor.width) // 2
     top_crop = (target_height - monitor.height) // 2
-    right_crop = left_crop + monitor.width
-    bottom_crop = top_crop + monitor.height
+    scale_x = image.width / target_width
+    scale_y = image.height / target_height
+    box = (
+        left_crop * scale_x,
+        top_crop * scale_y,
+        (left_crop + monitor.width) * scale_x,
+        (top_crop + monitor.height) * scale_y,
+    )
+
+    resampling = __resampling_for(target_width, image.width)
+    return image.resize((monitor.width, monitor.height), resampling, box=box), (0, 0)
+
 
-    return scaled_image.crop((left_crop, top_crop, right_crop, bottom_crop))
+def __contain_size(width: int, height: int, monitor: MMMonitor) -> tuple[int, int]:
+    img_aspect = width / height
+    screen_aspect = monitor.width / monitor.height
+
+    if img_aspect < screen_aspect:
+        return int(monitor.height * img_aspect), monitor.height
+    elif img_aspect > screen_aspect:
+        return monitor.width, int(monitor.width / img_aspect)
+    else:
+        return monitor.width, monitor.height
 
 
-def __fit_image_to_screen_contain(image: Image.Image, monitor: MMMonitor, background_color: str) -> Image.Image:
+def __fit_image_to_screen_contain(image: Image.Image, monitor: MMMonitor) -> MMFitTile:
     """
-    Fit the image within monitor bounds while preserving aspect ratio,
-    centering it on a background of specified color.
+    Fit the image within monitor bounds while preserving aspect ratio.
 
     The function calculates the largest size that fits into the
-    monitor rectangle without cropping the image.  The resized
-    image is then centered and padded with ``background_color``.
+    monitor rectangle without cropping the image. The resized
+    image is returned with the offset that centers it on the monitor,
+    the padding is left to the background of the canvas.
 
     :param image: Source image to be scaled.
     :param monitor: Monitor object providing width and height.
-    :param background_color: Color used for padding areas.
-    :return: New image sized to fit within the monitor, centered.
-
+    :return: A tuple of the scaled image and its (x, y) offset within the monitor.
     """
-    img_aspect = image.width / image.height
-    screen_aspect = monitor.width / monitor.height
-
-    if img_aspect < screen_aspect:
-        target_width = int(monitor.height * img_aspect)
-        target_height = monitor.height
-    elif img_aspect > screen_aspect:
-        target_height = int(monitor.width / img_aspect)
-        target_width = monitor.width
-    else:
-        target_width = monitor.width
-        target_height = monitor.height
+    target_width, target_height = __contain_size(image.width, image.height, monitor)
 
-    resampling = Image.Resampling.LANCZOS if target_width > image.width else Image.Resampling.BICUBIC
+    resampling = __resampling_for(target_width, image.width)
     scaled_image = image.resize((target_width, target_height), resampling)
 
-    return __fit_image_to_screen_centered(scaled_image, monitor, background_color)
+    return scaled_image, ((monitor.width - target_width) // 2, (monitor.height - target_height) // 2)
 
 
-def __apply_fit_mode(image: Image.Image, monitor: MMMonitor, fit_mode: MMFitMode, background_color: str) -> Image.Image:
+def __apply_fit_mode(image: Image.Image, monitor: MMMonitor, fit_mode: MMFitMode) -> MMFitTile:
     """
     Resizes and adjusts an image to fit a specified monitor display while applying the requested fitting mode.
 
-    Adjusts the dimensions of the provided image to match or conform to the given monitor's resolution,
-    applying either centered cropping, cover (stretching), or contain (scaling with padding) based on
-    the specified `fit_mode`. The background color is used for padding when necessary.
+    Only the pixels that end up on the monitor are produced: the result is a tile, which may be smaller than the
+    monitor, and the offset within the monitor to paste it at. Areas of the monitor not covered by the tile are
+    expected to already hold the background color, so no monitor-sized intermediate canvas is allocated.
 
     :param Image.Image image: Input PIL Image object to be adjusted for display.
     :param MMMonitor monitor: Monitor object defining the target resolution and dimensions.
     :param MMFitMode fit_mode: Enumeration value specifying how the image should be fitted.
-    :param str background_color: Hexadecimal color code (e.g., ``"#RRGGBB"``) used for padding.
-    :return: Resized and adjusted PIL Image object that fits the specified monitor dimensions according to
-        the provided fitting strategy.
+    :return: A tuple of the fitted PIL Image object (the input image itself when no work was needed) and its
+        (x, y) offset within the monitor.
 
     """
     if image.width == monitor.width and image.height == monitor.height:
         # image already fits monitor perfectly.
-        return image
+        return image, (0, 0)
 
     match fit_mode:
         case MMFitMode.CENTERED:
-            return __fit_image_to_screen_centered(image, monitor, background_color)
+            return __fit_image_to_screen_centered(image, monitor)
         case MMFitMode.COVER:
             return __fit_image_to_screen_cover(image, monitor)
         case MMFitMode.CONTAIN:
-            return __fit_image_to_screen_contain(image, monitor, background_color)
+            return __fit_image_to_screen_contain(image, monitor)
+
+
+def __fitted_size(width: int, height: int, monitor: MMMonitor, fit_mode: MMFitMode) -> tuple[int, int]:
+    """
+    Determine the size of the tile :func:`__apply_fit_mode` produces for an image, without resizing anything.
+
+    :param int width: Width of the input image.
+    :param int height: Height of the input image.
+    :param MMMonitor monitor: Monitor object defining the target resolution and dimensions.
+    :param MMFitMode fit_mode: Enumeration value specifying how the image should be fitted.
+    :return: The (width, height) of the fitted tile.
+    """
+    if width == monitor.width and height == monitor.height:
+        return width, height
+
+    match fit_mode:
+        case MMFitMode.CENTERED:
+            return min(width, monitor.width), min(height, monitor.height)
+        case MMFitMode.COVER:
+            return monitor.width, monitor.height
+        case MMFitMode.CONTAIN:
+            return __contain_size(width, height, monitor)
+
+
+def __fit_scale(width: int, height: int, monitor: MMMonitor, fit_mode: MMFitMode) -> float:
+    """
+    Determine the factor :func:`__apply_fit_mode` scales an image by, without resizing anything.
+
+    :param int width: Width of the input image.
+    :param int height: Height of the input image.
+    :param MMMonitor monitor: Monitor object defining the target resolution and dimensions.
+    :param MMFitMode fit_mode: Enumeration value specifying how the image should be fitted.
+    :return: The scale factor, above 1 when the image is upscaled.
+    """
+    if width == monitor.width and height == monitor.height:
+        return 1.0
+
+    match fit_mode:
+        case MMFitMode.CENTERED:
+            return 1.0
+        case MMFitMode.COVER:
+            return max(monitor.width / width, monitor.height / height)
+        case MMFitMode.CONTAIN:
+            return min(monitor.width / width, monitor.height / height)
@@ -1,7 +1,7 @@
 from io import BytesIO
 
-from PIL import Image
-from PIL.ImageCms import ImageCmsProfile, profileToProfile, Intent
+from PIL import Image, ImageMath
+from PIL.ImageCms import ImageCmsProfile, profileToProfile, Intent, buildTransform, applyTransform, createProfile
 
 from app.config.constants import STANDARD_SRGB_PROFILE, TARGET_IMAGE_MODE
 
@@ -34,3 +34,33 @@ def __bake_color_profile(image: Image.Image, target_profile: ImageCmsProfile):
         outputMode=TARGET_IMAGE_MODE,
         inPlace=True
     )
+
+
+def __color_difference(image_a: Image.Image, image_b: Image.Image, profile: ImageCmsProfile) -> tuple[float, float]:
+    """
+    Measure the perceptual color difference between two images of the same size and color profile,
+    as the CIE76 Delta E between their pixels in L*a*b* space. A Delta E around 1 is about the smallest
+    difference a person can notice.
+
+    :param image_a: The first image.
+    :param image_b: The second image, with the same size as the first.
+    :param profile: The ICC profile the pixel data of both images is in.
+    :return: A tuple of the mean and maximum Delta E over all pixels.
+    """
+    to_lab = buildTransform(profile, ImageCmsProfile(createProfile('LAB')), TARGET_IMAGE_MODE, 'LAB')
+    channels = {
+        f'{name}{suffix}': channel.convert('F')
+        for suffix, image in (('1', image_a), ('2', image_b))
+        for name, channel in zip('lab', applyTransform(image, to_lab).split())
+    }
+
+    # Pillow stores L* scaled to 0-255, a* and b* are offset by the same amount in both images.
+    delta_e = ImageMath.lambda_eval(
+        lambda c: (((c['l1'] - c['l2']) * (100 / 255)) ** 2
+                   + (c['a1'] - c['a2']) ** 2
+                   + (c['b1'] - c['b2']) ** 2) ** 0.5,
+        **channels)
+
+    # Box-downsampling to a single pixel averages the float image exactly, unlike the binned ImageStat.
+    mean = delta_e.resize((1, 1), Image.Resampling.BOX).getpixel((0, 0))
+    return mean, delta_e.getextrema()[1]
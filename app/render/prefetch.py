@@ -0,0 +1,226 @@
+import io
+import mmap
+import threading
+from collections import Counter
+from concurrent.futures import Future
+from concurrent.futures.thread import ThreadPoolExecutor
+from functools import cache
+from pathlib import Path
+from typing import BinaryIO
+
+# Filesystems known to be backed by local storage, any other type (network, FUSE, cluster) is read into memory.
+LOCAL_FILESYSTEMS = {'ext2', 'ext3', 'ext4', 'xfs', 'btrfs', 'f2fs', 'zfs', 'bcachefs', 'jfs', 'reiserfs', 'tmpfs',
+                     'ramfs', 'overlay', 'vfat', 'exfat', 'ntfs3', 'hfsplus'}
+
+
+@cache
+def _mount_points() -> list[tuple[str, str]]:
+    """
+    Read the mount table of the current system.
+
+    :return: A list of (mount point, filesystem type) tuples, longest mount points first.
+        Empty when the mount table is not available (non-Linux systems).
+    """
+    try:
+        with open('/proc/mounts', 'r', encoding='utf-8') as f:
+            mounts = [(parts[1], parts[2]) for parts in (line.split() for line in f) if len(parts) >= 3]
+    except OSError:
+        return []
+    return sorted(mounts, key=lambda m: len(m[0]), reverse=True)
+
+
+def _is_local_path(path: Path) -> bool:
+    """
+    Determine whether a path lives on local storage, in which case it is cheaper to memory map than to read.
+    Paths are considered remote when the mount table is unavailable or their filesystem type is not known to be
+    local, so they are read into memory.
+    """
+    mounts = _mount_points()
+    resolved = str(path.resolve())
+    for mount_point, fs_type in mounts:
+        if resolved == mount_point or resolved.startswith(mount_point.rstrip('/') + '/'):
+            return fs_type in LOCAL_FILESYSTEMS
+    return False
+
+
+class _MappedFile(io.RawIOBase):
+    """
+    Read-only raw file over its own memory mapping of a file.
+    Unlike a bare :class:`mmap.mmap`, seeking past the end is allowed and reads there return no data,
+    so decoders fail on bad input the same way they do on a regular file.
+    """
+
+    def __init__(self, fileno: int):
+        super().__init__()
+        self.__mapping = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+        self.__view = memoryview(self.__mapping)
+        self.__position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        size = max(0, min(len(buffer), len(self.__view) - self.__position))
+        buffer[:size] = self.__view[self.__position:self.__position + size]
+        self.__position += size
+        return size
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        match whence:
+            case io.SEEK_SET:
+                position = offset
+            case io.SEEK_CUR:
+                position = self.__position + offset
+            case io.SEEK_END:
+                position = len(self.__view) + offset
+            case _:
+                raise ValueError(f'Invalid whence ({whence})')
+
+        if position < 0:
+            raise OSError(f'Negative seek position {position}')
+        self.__position = position
+        return position
+
+    def tell(self) -> int:
+        return self.__position
+
+    def close(self):
+        if not self.closed:
+            self.__view.release()
+            self.__mapping.close()
+        super().close()
+
+
+class _PrefetchedSource:
+    """
+    The content of a prefetched source file, either read into memory or memory mapped.
+    Every reader is an independent file-like object, so several decoders can use the same source at once.
+    """
+
+    def __init__(self, path: Path):
+        self.__file: BinaryIO | None = None
+        self.__mapping: mmap.mmap | None = None
+        self.__data: bytes | None = None
+
+        if _is_local_path(path) and path.stat().st_size > 0:
+            self.__file = open(path, 'rb')
+            self.__mapping = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ)
+            if hasattr(self.__mapping, 'madvise'):
+                # Let the kernel start paging the file in before a decoder touches it.
+                self.__mapping.madvise(mmap.MADV_WILLNEED)
+        else:
+            with open(path, 'rb') as f:
+                self.__data = f.read()
+
+    def reader(self) -> BinaryIO:
+        if self.__data is not None:
+            return io.BytesIO(self.__data)
+        # A new mapping of the same file shares the page cache, but has its own read position.
+        return io.BufferedReader(_MappedFile(self.__file.fileno()))
+
+    def close(self):
+        if self.__mapping is not None:
+            self.__mapping.close()
+        if self.__file is not None:
+            self.__file.close()
+        self.__data = None
+
+
+class MMSourcePrefetcher:
+    """
+    Reads the source images of upcoming image sets ahead of the render workers, using a small dedicated I/O pool.
+
+    The prefetcher is given the order in which sets will be rendered. Whenever a worker starts a set, the sources of
+    the next ``depth`` sets are scheduled for reading. A source is kept in memory while any started or scheduled set
+    still uses it, and released once all of them have finished. Once closed, sets are no longer prefetched and
+    sources are opened from storage.
+    """
+    depth: int
+
+    def __init__(self, order: list[list[Path]], depth: int, io_workers: int):
+        self.depth = depth
+
+        self.__order = order
+        self.__executor = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix='prefetch')
+        self.__lock = threading.Lock()
+        self.__sources: dict[Path, Future[_PrefetchedSource]] = {}
+        self.__references: Counter[Path] = Counter()
+        self.__scheduled = 0
+        self.__closed = False
+
+    def start(self, position: int):
+        """
+        Mark the set at the given position as started and schedule reading the sources of the sets ahead of it.
+
+        :param position: Position of the set in the render order.
+        """
+        with self.__lock:
+            if self.__closed:
+                return
+
+            target = min(len(self.__order), position + 1 + self.depth)
+            while self.__scheduled < target:
+                for path in self.__order[self.__scheduled]:
+                    self.__references[path] += 1
+                    if path not in self.__sources:
+                        self.__sources[path] = self.__executor.submit(_PrefetchedSource, path)
+                self.__scheduled += 1
+
+    def finish(self, position: int):
+        """
+        Mark the set at the given position as finished, releasing sources no other started or scheduled set uses.
+
+        :param position: Position of the set in the render order.
+        """
+        with self.__lock:
+            if self.__closed:
+                return
+
+            for path in self.__order[position]:
+                self.__references[path] -= 1
+                if self.__references[path] > 0:
+                    continue
+
+                del self.__references[path]
+                future = self.__sources.pop(path, None)
+                if future is not None:
+                    self.__release(future)
+
+    def open(self, path: Path) -> BinaryIO | Path:
+        """
+        Open a source image, waiting for its prefetch to complete when it is still being read.
+        Sources that were not scheduled are returned as their path, to be opened from storage by the decoder.
+
+        :param path: Path of the source image.
+        :return: A binary file-like object positioned at the start of the source, or the path itself.
+        """
+        with self.__lock:
+            future = self.__sources.get(path)
+
+        if future is None:
+            return path
+        return future.result().reader()
+
+    def close(self):
+        """
+        Stop prefetching and release all sources. Readers that were already opened stay usable.
+        """
+        with self.__lock:
+            self.__closed = True
+        self.__executor.shutdown(wait=True, cancel_futures=True)
+        with self.__lock:
+            for future in self.__sources.values():
+                self.__release(future)
+            self.__sources.clear()
+            self.__references.clear()
+
+    @staticmethod
+    def __release(future: Future[_PrefetchedSource]):
+        def close_source(f: Future[_PrefetchedSource]):
+            if not f.cancelled() and f.exception() is None:
+                f.result().close()
+
+        future.add_done_callback(close_source)
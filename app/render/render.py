@@ -1,10 +1,139 @@
+import threading
+from collections import Counter
+from logging import getLogger
 from pathlib import Path
 
 from PIL import Image
+from PIL.ImageCms import ImageCmsProfile
 
-from app.config import MMFitMode, MMDesktopLayout, MMImageSet, STANDARD_SRGB_PROFILE, TARGET_IMAGE_MODE
-from .fitting import __apply_fit_mode
-from .icc import __bake_color_profile
+from app.config import MMColorOrder, MMFitMode, MMMonitor, MMDesktopLayout, MMImageSet, STANDARD_SRGB_PROFILE, TARGET_IMAGE_MODE
+from .cache import MMDecodedImageCache
+from .fitting import MMFitTile, __apply_fit_mode, __fit_scale, __fitted_size
+from .icc import __bake_color_profile, __color_difference
+from .prefetch import MMSourcePrefetcher
+
+logger = getLogger('render')
+
+# Each worker thread keeps a base canvas per layout size, so sets sharing a layout do not allocate a new one.
+__worker_canvas = threading.local()
+
+
+def __image_bytes(image: Image.Image) -> int:
+    return image.width * image.height * len(image.getbands())
+
+
+def __acquire_canvas(layout: MMDesktopLayout, background_color: str) -> tuple[Image.Image, int]:
+    """
+    Get a base canvas for the given layout, filled with the background color.
+    The canvas of the calling worker thread is reused when it has one of the layout's size,
+    otherwise a new one is allocated and kept for the next set.
+
+    :param layout: Layout definition providing the total canvas size.
+    :param background_color: Color to fill the canvas with.
+    :return: A tuple of the canvas and the number of bytes allocated for it (0 when reused).
+    """
+    size = (layout.total_width, layout.total_height)
+    if not hasattr(__worker_canvas, 'canvases'):
+        __worker_canvas.canvases = {}
+    canvases: dict[tuple[int, int], Image.Image] = __worker_canvas.canvases
+
+    canvas = canvases.get(size, None)
+    if canvas is not None:
+        canvas.paste(background_color, (0, 0, *size))
+        return canvas, 0
+
+    canvas = Image.new(TARGET_IMAGE_MODE, size, color=background_color)
+    canvases[size] = canvas
+    return canvas, __image_bytes(canvas)
+
+
+def __decode_source_image(image_path: Path, prefetcher: MMSourcePrefetcher | None) -> tuple[Image.Image, int]:
+    """
+    Open and decode a source image and convert it to the target mode.
+
+    :param image_path: Path of the source image.
+    :param prefetcher: Optional prefetcher holding the source in memory, to decode from instead of storage.
+    :return: A tuple of the decoded image and the number of bytes allocated for it.
+    """
+    image = Image.open(prefetcher.open(image_path) if prefetcher else image_path)
+    allocated_bytes = __image_bytes(image)
+
+    if image.mode != TARGET_IMAGE_MODE:
+        image = image.convert(TARGET_IMAGE_MODE)
+        allocated_bytes += __image_bytes(image)
+    else:
+        image.load()
+
+    return image, allocated_bytes
+
+
+def __source_cache_key(image_path: Path, *stage: Path | str | None) -> tuple:
+    return image_path.resolve(), image_path.stat().st_mtime_ns, *stage
+
+
+def __prefers_fit_first(source_size: tuple[int, int],
+                        monitor: MMMonitor,
+                        fit_mode: MMFitMode,
+                        color_order: MMColorOrder) -> bool:
+    """
+    Decide whether a tile should be fitted before its colors are converted to the target profile.
+
+    :param source_size: The (width, height) of the source image.
+    :param monitor: The monitor the tile is fitted to.
+    :param fit_mode: Strategy used when an image does not match a monitor’s resolution.
+    :param color_order: The requested order, :attr:`MMColorOrder.AUTO` picks the cheaper one.
+    :return: True when the tile should be fitted first, False when the source should be color converted first.
+    """
+    match color_order:
+        case MMColorOrder.BAKE_FIRST:
+            return False
+        case MMColorOrder.FIT_FIRST:
+            return True
+
+    # Convert colors after downscaling or cropping, when the tile has fewer pixels than the source. Upscaled tiles are
+    # converted before fitting, also when cropping leaves the tile with fewer pixels.
+    if __fit_scale(*source_size, monitor, fit_mode) > 1:
+        return False
+    tile_width, tile_height = __fitted_size(*source_size, monitor, fit_mode)
+    return tile_width * tile_height < source_size[0] * source_size[1]
+
+
+def __fit_and_bake(image: Image.Image,
+                   monitor: MMMonitor,
+                   fit_mode: MMFitMode,
+                   target_profile: ImageCmsProfile,
+                   fit_first: bool,
+                   owned: bool) -> tuple[MMFitTile, int]:
+    """
+    Fit a decoded source image to a monitor and convert it to the target color profile, in the given order.
+
+    :param image: The decoded source image, in the target mode.
+    :param monitor: The monitor to fit the image to.
+    :param fit_mode: Strategy used when an image does not match a monitor’s resolution.
+    :param target_profile: The ICC profile the tile should be converted to.
+    :param fit_first: Whether to fit before converting colors.
+    :param owned: Whether the source image may be modified, shared images are copied before converting in place.
+    :return: A tuple of the fitted tile and the number of bytes allocated for it.
+    """
+    allocated_bytes = 0
+
+    if not fit_first:
+        if not owned:
+            image = image.copy()
+            allocated_bytes += __image_bytes(image)
+        __bake_color_profile(image, target_profile)
+
+    tile_image, tile_offset = __apply_fit_mode(image, monitor, fit_mode)
+    if tile_image is not image:
+        allocated_bytes += __image_bytes(tile_image)
+
+    if fit_first:
+        if tile_image is image and not owned:
+            tile_image = image.copy()
+            allocated_bytes += __image_bytes(tile_image)
+        __bake_color_profile(tile_image, target_profile)
+
+    return (tile_image, tile_offset), allocated_bytes
 
 
 def render_image_set(image_set: MMImageSet,
@@ -13,48 +142,363 @@ def render_image_set(image_set: MMImageSet,
                      fit_mode: MMFitMode,
                      background_color: str,
                      bake_screen_icc: bool,
-                     compression_quality: int):
+                     compression_quality: int,
+                     image_cache: MMDecodedImageCache | None = None,
+                     prefetcher: MMSourcePrefetcher | None = None,
+                     color_order: MMColorOrder = MMColorOrder.AUTO):
     """
-    Render a composite image from an image set based on a desktop layout, applying color profile baking
-    and fitting rules for each monitor. The function creates a base canvas sized to the total area of
-    the layout, then iterates over each monitor to place its corresponding image. Images are converted
-    to the target mode and optionally baked with the monitor’s ICC profile or standard sRGB.
-    The resulting composite is saved to the specified path using the chosen compression quality.
+    Render a composite image from an image set for a single desktop layout.
+    See :func:`render_image_set_layouts` for the details.
 
     :param image_set: A collection mapping device identifiers to image file paths.
     :param output_path: Destination file for the rendered image.
     :param layout: Layout definition containing monitor geometry and positioning information.
     :param fit_mode: Strategy used when an image does not match a monitor’s resolution.
-    :param background_color: Color value applied as background during fitting operations.
+    :param background_color: Color value applied to the canvas areas not covered by an image.
     :param bake_screen_icc: Flag indicating whether to apply each monitor’s ICC profile.
     :param compression_quality: JPEG quality factor (1–100) for the output image.
+    :param image_cache: Optional cache of decoded source images shared between workers.
+    :param prefetcher: Optional prefetcher that has read the source images ahead of rendering.
+    :param color_order: Order of color conversion and fitting, defaults to the cheaper one per tile.
     """
-    base_image = Image.new(TARGET_IMAGE_MODE, (layout.total_width, layout.total_height), color=background_color)
+    render_image_set_layouts(image_set,
+                             {output_path: layout},
+                             fit_mode,
+                             background_color,
+                             bake_screen_icc,
+                             compression_quality,
+                             image_cache,
+                             prefetcher,
+                             color_order)
 
-    for monitor in layout.monitors:
-        image_path = image_set.images.get(monitor.device_id, None)
-        if not image_path:
-            # No image defined for this monitor.
-            continue
 
-        image = Image.open(image_set.images[monitor.device_id])
+def render_image_set_layouts(image_set: MMImageSet,
+                             targets: dict[Path, MMDesktopLayout],
+                             fit_mode: MMFitMode,
+                             background_color: str,
+                             bake_screen_icc: bool,
+                             compression_quality: int,
+                             image_cache: MMDecodedImageCache | None = None,
+                             prefetcher: MMSourcePrefetcher | None = None,
+                             color_order: MMColorOrder = MMColorOrder.AUTO):
+    """
+    Render composite images from an image set for one or more desktop layouts in a single pass, applying color
+    profile baking and fitting rules for each monitor. For every layout, the function takes a base canvas sized to
+    the total area of the layout, then iterates over each monitor to place its corresponding image. Images are
+    converted to the target mode and optionally baked with the monitor’s ICC profile or standard sRGB.
+
+    Each source is decoded once per call and fitted once per distinct (width, height, ICC) monitor target, so
+    monitors shared between layouts reuse the same tile. Color conversion runs on the tile when downscaling or
+    cropping leaves it with fewer pixels than the source, and on the source (once per distinct color profile) when
+    upscaling. Fitted images are pasted directly at their final offset on the base canvas, which is reused by the
+    worker for subsequent sets with the same layout size.
+    The resulting composites are saved to their paths using the chosen compression quality.
 
-        if image.mode != TARGET_IMAGE_MODE:
-            image = image.convert(TARGET_IMAGE_MODE)
+    :param image_set: A collection mapping device identifiers to image file paths.
+    :param targets: Destination file for the rendered image by layout definition to render it for.
+    :param fit_mode: Strategy used when an image does not match a monitor’s resolution.
+    :param background_color: Color value applied to the canvas areas not covered by an image.
+    :param bake_screen_icc: Flag indicating whether to apply each monitor’s ICC profile.
+    :param compression_quality: JPEG quality factor (1–100) for the output image.
+    :param image_cache: Optional cache of decoded source images shared between workers.
+    :param prefetcher: Optional prefetcher that has read the source images ahead of rendering.
+    :param color_order: Order of color conversion and fitting, defaults to the cheaper one per tile.
+    """
 
+    def color_target(monitor: MMMonitor) -> tuple[ImageCmsProfile, Path | None]:
         # If bake_icc is true, we need to bake for the target monitor, else we can just convert to sRGB.
         if bake_screen_icc and monitor.cms_profile:
-            __bake_color_profile(image, monitor.cms_profile)
+            return monitor.cms_profile, monitor.icc.resolve()
+        return STANDARD_SRGB_PROFILE, None
+
+    # Decoded sources of this set, with whether they are owned by this call (and may be modified) or shared.
+    decoded: dict[Path, tuple[Image.Image, bool]] = {}
+    baked: dict[tuple[Path, Path | None], Image.Image] = {}
+    tiles: dict[tuple[Path, int, int, Path | None], MMFitTile] = {}
+    allocated_bytes = 0
+
+    source_sizes: dict[Path, tuple[int, int]] = {}
+
+    def source_size(image_path: Path) -> tuple[int, int]:
+        if image_path in source_sizes:
+            return source_sizes[image_path]
+
+        image = decoded[image_path][0] if image_path in decoded else None
+        if image is None and image_cache is not None:
+            image = image_cache.peek(__source_cache_key(image_path, 'decoded'))
+
+        if image is not None:
+            source_sizes[image_path] = image.size
         else:
-            __bake_color_profile(image, STANDARD_SRGB_PROFILE)
+            # Only reads the header, the pixel data is decoded when the source is used.
+            with Image.open(prefetcher.open(image_path) if prefetcher else image_path) as header:
+                source_sizes[image_path] = header.size
+        return source_sizes[image_path]
+
+    def decode_source(image_path: Path) -> Image.Image:
+        nonlocal allocated_bytes
+        image, decoded_bytes = __decode_source_image(image_path, prefetcher)
+        allocated_bytes += decoded_bytes
+        return image
+
+    def shared_source(image_path: Path) -> tuple[Image.Image, bool]:
+        if image_path not in decoded:
+            if image_cache is None:
+                decoded[image_path] = decode_source(image_path), True
+            else:
+                cache_key = __source_cache_key(image_path, 'decoded')
+                decoded[image_path] = image_cache.get_or_load(cache_key, lambda: decode_source(image_path)), False
+        return decoded[image_path]
+
+    def release_source(image_path: Path) -> bool:
+        # Count a use of the decoded source, the last one may modify it if it is owned by this call.
+        pending_uses[image_path] -= 1
+        return pending_uses[image_path] == 0
+
+    def bake_source(image_path: Path, target_profile: ImageCmsProfile, last_use: bool) -> Image.Image:
+        nonlocal allocated_bytes
+        image, owned = decoded.get(image_path, None) or (decode_source(image_path), True)
+        if last_use:
+            decoded.pop(image_path, None)
+        else:
+            decoded[image_path] = image, owned
+
+        if not (owned and last_use):
+            image = image.copy()
+            allocated_bytes += __image_bytes(image)
+
+        __bake_color_profile(image, target_profile)
+        return image
+
+    # Decide the order of color conversion and fitting for every distinct tile.
+    plans: dict[tuple[Path, int, int, Path | None], tuple[MMMonitor, ImageCmsProfile, bool]] = {}
+    for layout in targets.values():
+        for monitor in layout.monitors:
+            image_path = image_set.images.get(monitor.device_id, None)
+            if not image_path:
+                # No image defined for this monitor.
+                continue
+
+            target_profile, target_icc = color_target(monitor)
+            tile_key = (image_path, monitor.width, monitor.height, target_icc)
+            if tile_key not in plans:
+                if color_order == MMColorOrder.AUTO:
+                    fit_first = __prefers_fit_first(source_size(image_path), monitor, fit_mode, color_order)
+                else:
+                    fit_first = color_order == MMColorOrder.FIT_FIRST
+                plans[tile_key] = (monitor, target_profile, fit_first)
+
+    # Number of fit first tiles and distinct color profiles using each decoded source, the source is only modified
+    # in place by its last use and copied otherwise.
+    pending_uses: Counter[Path] = Counter(k[0] for k, (_, _, fit_first) in plans.items() if fit_first)
+    pending_uses.update(
+        image_path for image_path, _ in {(k[0], k[3]) for k, (_, _, fit_first) in plans.items() if not fit_first}
+    )
+
+    # Fit first tiles go first, so the last source bake may convert the decoded source in place.
+    for tile_key, (monitor, target_profile, fit_first) in sorted(plans.items(), key=lambda p: not p[1][2]):
+        image_path, _, _, target_icc = tile_key
+
+        if fit_first:
+            image, owned = shared_source(image_path)
+            if release_source(image_path):
+                del decoded[image_path]
+            else:
+                owned = False
+            tiles[tile_key], tile_bytes = __fit_and_bake(image, monitor, fit_mode, target_profile, True, owned)
+            allocated_bytes += tile_bytes
+            continue
+
+        source_key = (image_path, target_icc)
+        if source_key not in baked:
+            # Counted outside of the loader, so bakes that are already cached count as a use too.
+            last_use = release_source(image_path)
+            if image_cache is None:
+                baked[source_key] = bake_source(image_path, target_profile, last_use)
+            else:
+                cache_key = __source_cache_key(image_path, 'baked', target_icc)
+                baked[source_key] = image_cache.get_or_load(cache_key,
+                                                            lambda: bake_source(image_path, target_profile, last_use))
+                if last_use:
+                    decoded.pop(image_path, None)
 
         # Apply fit mode.
-        image = __apply_fit_mode(image, monitor, fit_mode, background_color)
+        image = baked[source_key]
+        tiles[tile_key] = __apply_fit_mode(image, monitor, fit_mode)
+        if tiles[tile_key][0] is not image:
+            allocated_bytes += __image_bytes(tiles[tile_key][0])
+
+    for output_path, layout in targets.items():
+        base_image, canvas_bytes = __acquire_canvas(layout, background_color)
+        allocated_bytes += canvas_bytes
+
+        for monitor in layout.monitors:
+            image_path = image_set.images.get(monitor.device_id, None)
+            if not image_path:
+                continue
+
+            tile_image, (tile_x, tile_y) = tiles[(image_path, monitor.width, monitor.height, color_target(monitor)[1])]
+            monitor_x, monitor_y = layout.offset_of(monitor)
+            base_image.paste(tile_image, (monitor_x + tile_x, monitor_y + tile_y))
+
+        # If we bake the monitor ICC's we should NOT embed the profile.
+        embed_icc = None if bake_screen_icc else STANDARD_SRGB_PROFILE.tobytes()
+        base_image.save(output_path, icc_profile=embed_icc, quality=compression_quality)
+
+    output_names = ', '.join(str(p) for p in targets.keys())
+    logger.debug(f'Allocated {allocated_bytes / 1024 ** 2:.1f} MiB of image buffers for {output_names}.')
+
+
+def relayout_image_set(image_set: MMImageSet,
+                       previous_path: Path,
+                       previous_layout: MMDesktopLayout,
+                       output_path: Path,
+                       layout: MMDesktopLayout,
+                       fit_mode: MMFitMode,
+                       background_color: str,
+                       bake_screen_icc: bool,
+                       compression_quality: int,
+                       image_cache: MMDecodedImageCache | None = None,
+                       color_order: MMColorOrder = MMColorOrder.AUTO) -> int:
+    """
+    Re-render a previously generated composite image for a changed desktop layout.
+    Regions of monitors that did not change size (or ICC, when baked) are copied from the previous output and moved to
+    their new offset, only the monitors that did change are decoded and fitted again. The previous output is expected to be
+    rendered with the same image set, fit mode, background color and ICC baking as requested here. When its size does
+    not match the previous layout, it is considered stale and all monitors are rendered from their source images.
+
+    :param image_set: A collection mapping device identifiers to image file paths.
+    :param previous_path: The composite image previously rendered for the previous layout.
+    :param previous_layout: The layout the previous composite image was rendered for.
+    :param output_path: Destination file for the rendered image, may be the same as the previous path.
+    :param layout: The new layout definition.
+    :param fit_mode: Strategy used when an image does not match a monitor’s resolution.
+    :param background_color: Color value applied to the canvas areas not covered by an image.
+    :param bake_screen_icc: Flag indicating whether to apply each monitor’s ICC profile.
+    :param compression_quality: JPEG quality factor (1–100) for the output image.
+    :param image_cache: Optional cache of decoded source images shared between workers.
+    :param color_order: Order of color conversion and fitting, defaults to the cheaper one per tile.
+    :return: The number of monitors that had to be rendered from their source image.
+    """
+    with Image.open(previous_path) as previous_image:
+        previous_size = previous_image.size
+
+    if previous_size != (previous_layout.total_width, previous_layout.total_height):
+        logger.warning(f'Image {previous_path} does not match the size of the previous layout, '
+                       f'rendering all monitors...')
+        render_image_set(image_set,
+                         output_path,
+                         layout,
+                         fit_mode,
+                         background_color,
+                         bake_screen_icc,
+                         compression_quality,
+                         image_cache,
+                         color_order=color_order)
+        return sum(1 for m in layout.monitors if image_set.images.get(m.device_id, None))
+
+    unchanged = layout.unchanged_monitors(previous_layout, bake_screen_icc)
+    rendered_monitors = 0
+
+    with Image.open(previous_path) as previous_image:
+        if previous_image.mode != TARGET_IMAGE_MODE:
+            previous_image = previous_image.convert(TARGET_IMAGE_MODE)
 
-        img_x_pos = int(monitor.x_pos - layout.min_x)
-        img_y_pos = int(monitor.y_pos - layout.min_y)
-        base_image.paste(image, (img_x_pos, img_y_pos))
+        base_image, allocated_bytes = __acquire_canvas(layout, background_color)
+
+        for monitor in layout.monitors:
+            monitor_x, monitor_y = layout.offset_of(monitor)
+
+            previous_monitor = unchanged.get(monitor.device_id, None)
+            if previous_monitor:
+                # Reuse the rendered region, it only moved.
+                previous_x, previous_y = previous_layout.offset_of(previous_monitor)
+                region = previous_image.crop((previous_x,
+                                              previous_y,
+                                              previous_x + previous_monitor.width,
+                                              previous_y + previous_monitor.height))
+                allocated_bytes += __image_bytes(region)
+                base_image.paste(region, (monitor_x, monitor_y))
+                continue
+
+            image_path = image_set.images.get(monitor.device_id, None)
+            if not image_path:
+                # No image defined for this monitor.
+                continue
+
+            # If bake_icc is true, we need to bake for the target monitor, else we can just convert to sRGB.
+            if bake_screen_icc and monitor.cms_profile:
+                target_profile = monitor.cms_profile
+            else:
+                target_profile = STANDARD_SRGB_PROFILE
+
+            if image_cache is None:
+                image, decoded_bytes = __decode_source_image(image_path, None)
+                allocated_bytes += decoded_bytes
+                owned = True
+            else:
+                cache_key = __source_cache_key(image_path, 'decoded')
+                image = image_cache.get_or_load(cache_key, lambda: __decode_source_image(image_path, None)[0])
+                owned = False
+
+            fit_first = __prefers_fit_first(image.size, monitor, fit_mode, color_order)
+            (tile_image, (tile_x, tile_y)), tile_bytes = __fit_and_bake(image,
+                                                                        monitor,
+                                                                        fit_mode,
+                                                                        target_profile,
+                                                                        fit_first,
+                                                                        owned)
+            allocated_bytes += tile_bytes
+            base_image.paste(tile_image, (monitor_x + tile_x, monitor_y + tile_y))
+            rendered_monitors += 1
+
+    logger.debug(f'Allocated {allocated_bytes / 1024 ** 2:.1f} MiB of image buffers for {output_path}, '
+                 f'reused {len(unchanged)} monitors.')
 
     # If we bake the monitor ICC's we should NOT embed the profile.
     embed_icc = None if bake_screen_icc else STANDARD_SRGB_PROFILE.tobytes()
     base_image.save(output_path, icc_profile=embed_icc, quality=compression_quality)
+    return rendered_monitors
+
+
+def measure_color_order_difference(image_set: MMImageSet,
+                                   layout: MMDesktopLayout,
+                                   fit_mode: MMFitMode,
+                                   bake_screen_icc: bool,
+                                   color_order: MMColorOrder = MMColorOrder.AUTO
+                                   ) -> dict[str, tuple[float, float] | None]:
+    """
+    Render every monitor tile of an image set in the order the given color order picks for it, and measure the color
+    difference against converting colors before fitting. Used to validate that choosing the cheaper order per tile
+    does not visibly change the generated wallpapers.
+
+    :param image_set: A collection mapping device identifiers to image file paths.
+    :param layout: Layout definition containing the monitors to render tiles for.
+    :param fit_mode: Strategy used when an image does not match a monitor’s resolution.
+    :param bake_screen_icc: Flag indicating whether to apply each monitor’s ICC profile.
+    :param color_order: The color order to validate, :attr:`MMColorOrder.AUTO` measures the order it picks per tile.
+    :return: The mean and maximum Delta E against converting colors first, by device ID of the monitors with an image.
+        None for monitors whose tile is converted before fitting, as it is identical to the reference.
+    """
+    differences: dict[str, tuple[float, float] | None] = {}
+
+    for monitor in layout.monitors:
+        image_path = image_set.images.get(monitor.device_id, None)
+        if not image_path:
+            continue
+
+        if bake_screen_icc and monitor.cms_profile:
+            target_profile = monitor.cms_profile
+        else:
+            target_profile = STANDARD_SRGB_PROFILE
+
+        image, _ = __decode_source_image(image_path, None)
+        if not __prefers_fit_first(image.size, monitor, fit_mode, color_order):
+            differences[monitor.device_id] = None
+            continue
+
+        (bake_first_tile, _), _ = __fit_and_bake(image, monitor, fit_mode, target_profile, False, False)
+        (fit_first_tile, _), _ = __fit_and_bake(image, monitor, fit_mode, target_profile, True, False)
+        differences[monitor.device_id] = __color_difference(bake_first_tile, fit_first_tile, target_profile)
+
+    return differences
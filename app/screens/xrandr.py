@@ -1,14 +1,14 @@
 import subprocess
+from pathlib import Path
 
 from app.config.model import MMMonitor
 
 
-def _xrandr_list_active_monitors() -> list[tuple[str, int, int, int, int]]:
+def parse_xrandr_active_monitors(output: str) -> list[tuple[str, int, int, int, int]]:
     """
-    Enumerate the active monitors reported by :program:`xrandr` and return a
-    structured representation of their properties.
+    Parse the output of ``xrandr --listactivemonitors`` into a structured representation of the monitors.
+    This works on saved output as well, so layouts can be inspected without a running X server.
 
-    The function executes ``xrandr --listactivemonitors`` and parses its output.
     Each monitor is represented as a tuple containing:
 
     * The monitor identifier string (e.g., ``"DP-4"`` or ``"HDMI-0"``).
@@ -17,29 +17,15 @@ def _xrandr_list_active_monitors() -> list[tuple[str, int, int, int, int]]:
     * The width of the monitor in pixels.
     * The height of the monitor in pixels.
 
-    :Returns:
-        A list of tuples.  Each tuple holds the location string, x and y
-        coordinates, width, and height for one active monitor.
-
-    :Raises:
-        Exception: If ``xrandr`` fails to run or returns a non‑zero exit code,
-        the function raises an exception containing the command’s error
-        message.
+    :param output: The text printed by ``xrandr --listactivemonitors``.
+    :return: A list of tuples. Each tuple holds the location string, x and y
+        coordinates, width, and height for one active monitor. Malformed lines are skipped.
     """
     # example:$ xrandr --listactivemonitors
     # Monitors: 2
     #  0: +*DP-4 5120/930x2160/390+0+0  DP-4
     #  1: +HDMI-0 1440/1024x2560/1920+5120+0  HDMI-0
-    result = subprocess.run(
-        ['xrandr', '--listactivemonitors'],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True)
-
-    if result.returncode != 0:
-        raise Exception(f"Failed to list active monitors using xrandr: {result.stderr}")
-
-    lines = result.stdout.splitlines()
+    lines = output.splitlines()
     screens: list[tuple[str, int, int, int, int]] = []
 
     for line in lines[1:]:
@@ -48,6 +34,8 @@ def _xrandr_list_active_monitors() -> list[tuple[str, int, int, int, int]]:
             continue
 
         line_parts = line.split()
+        if len(line_parts) < 4:
+            continue
         dim_str = line_parts[2]
         if 'x' not in dim_str:
             continue
@@ -70,6 +58,35 @@ def _xrandr_list_active_monitors() -> list[tuple[str, int, int, int, int]]:
     return screens
 
 
+def _xrandr_list_active_monitors() -> list[tuple[str, int, int, int, int]]:
+    """
+    Enumerate the active monitors reported by :program:`xrandr` and return a
+    structured representation of their properties.
+
+    The function executes ``xrandr --listactivemonitors`` and parses its output
+    using :func:`parse_xrandr_active_monitors`.
+
+    :Returns:
+        A list of tuples.  Each tuple holds the location string, x and y
+        coordinates, width, and height for one active monitor.
+
+    :Raises:
+        Exception: If ``xrandr`` fails to run or returns a non‑zero exit code,
+        the function raises an exception containing the command’s error
+        message.
+    """
+    result = subprocess.run(
+        ['xrandr', '--listactivemonitors'],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True)
+
+    if result.returncode != 0:
+        raise Exception(f"Failed to list active monitors using xrandr: {result.stderr}")
+
+    return parse_xrandr_active_monitors(result.stdout)
+
+
 def _xrandr_list_color_profiles() -> dict[str, str]:
     """
     Return a dictionary mapping XRANDR device names to their active ICC profile paths.
@@ -152,3 +169,26 @@ def get_xrandr_monitor_layout() -> list[MMMonitor]:
         ]
     except Exception as e:
         raise RuntimeError(f"Failed to get screen layout: {str(e)}") from e
+
+
+def load_xrandr_monitor_layout(listactivemonitors_path: Path) -> list[MMMonitor]:
+    """
+    Load a monitor layout from saved ``xrandr --listactivemonitors`` output.
+    Color profiles can not be derived from this output, so the monitors have no ICC set.
+
+    :param listactivemonitors_path: Path of the file containing the saved output.
+    :return: A list of :class:`MMMonitor` objects, one for each monitor in the output.
+    :raises RuntimeError: If the file can not be read or contains no monitors.
+    """
+    try:
+        active_monitors = parse_xrandr_active_monitors(listactivemonitors_path.read_text(encoding='utf-8'))
+
+        if not active_monitors:
+            raise RuntimeError(f"No active monitors found in {listactivemonitors_path}")
+
+        return [
+            MMMonitor(device_id=device_id, x_pos=x_pos, y_pos=y_pos, width=width, height=height)
+            for device_id, x_pos, y_pos, width, height in active_monitors
+        ]
+    except Exception as e:
+        raise RuntimeError(f"Failed to load screen layout: {str(e)}") from e
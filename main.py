@@ -3,7 +3,8 @@ import sys
 from argparse import ArgumentParser
 from pathlib import Path
 
-from app.commands import GenerateCommand, Command, InitCommand
+from app.commands import GenerateCommand, Command, InitCommand, MergeCommand, RelayoutCommand, \
+    ValidateColorOrderCommand
 
 if __name__ == '__main__':
     arg_parser = ArgumentParser(description='Batch generate multi-monitor wallpapers')
@@ -28,6 +29,9 @@ if __name__ == '__main__':
     commands: list[Command] = [
         InitCommand(command_arg_parser),
         GenerateCommand(command_arg_parser),
+        MergeCommand(command_arg_parser),
+        RelayoutCommand(command_arg_parser),
+        ValidateColorOrderCommand(command_arg_parser),
     ]
 
     # Parse arguments